@@ -122,13 +122,20 @@ class Stockfish(Agent):
 
 
 class NegativeStockfish(Agent):
-  def __init__(self, engine, time_limit = 0.1):
+  def __init__(self, engine, time_limit = 0.1, multipv = False):
     self.engine = engine
-    # this analyzes moves individually so same limit as normal Stockfish is excessive w/ very large execution time
-    self.time_limit = (time_limit/1000000)
+    self.multipv = multipv
+    if multipv:
+      # one search covers every root move, so the normal Stockfish limit is affordable
+      self.time_limit = time_limit
+    else:
+      # this analyzes moves individually so same limit as normal Stockfish is excessive w/ very large execution time
+      self.time_limit = (time_limit/1000000)
 
   def __call__(self, board_fen):
     board = chess.Board(board_fen)
+    if self.multipv:
+      return self.worst_move(board).uci()
     scores = []
     for move in board.legal_moves:
       board.push(move)
@@ -142,3 +149,15 @@ class NegativeStockfish(Agent):
     index = numpy.argmax([int(s) for s in scores])
     move = list(board.legal_moves)[index]
     return (move.uci())
+
+  def worst_move(self, board):
+    # single MultiPV search ranking every legal move; game=self keeps the engine's hash between calls
+    moves = list(board.legal_moves)
+    infos = self.engine.analyse(board, chess.engine.Limit(time=self.time_limit), multipv=len(moves),
+                                game=self, info=chess.engine.INFO_SCORE | chess.engine.INFO_PV)
+    infos = [info for info in infos if "score" in info and info.get("pv")]
+    if not infos:
+      return random.choice(moves)
+    # Score ordering handles mates correctly (getting mated is below any centipawn score)
+    worst = min(infos, key=lambda info: info["score"].pov(board.turn))
+    return worst["pv"][0]
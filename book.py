@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+# Offline opening book builder for the Turochamp agents
+# Explores the first plies of the game, searches every position where the agent is to move and writes the
+# moves it would play to a Polyglot book (readable by chess.polyglot), which agents use with BOOKFILE set.
+#
+#   python3 book.py --plies 6                          every agent in AGENT_MAPPING, all opponent replies
+#   python3 book.py "Knight PST" --maxplies 3 --opponents
+#       one agent searched one ply deeper, opponent replies limited to what the tournament agents play
+
+import argparse
+import math
+import os
+
+import chess as c
+import chess.polyglot
+
+from main import AGENT_MAPPING
+
+WEIGHT_SCALE = 10000
+CASTLING_ROOKS = {c.G1: c.H1, c.C1: c.A1, c.G8: c.H8, c.C8: c.A8}
+
+
+def move_weights(agent, n):
+    "Book weights for the n best moves, matching the probability that getindex() picks each of them"
+    if agent.EasyLearn <= 1 or n == 1:
+        return [WEIGHT_SCALE]
+    last = min(n, agent.EasyLearn) - 1
+    # getindex() takes int(expovariate(EasyLambda)) capped at last, P(index = k) = e^-lk - e^-l(k+1)
+    probs = [math.exp(-agent.EasyLambda * k) - math.exp(-agent.EasyLambda * (k + 1)) for k in range(last)]
+    probs.append(math.exp(-agent.EasyLambda * last))
+    return [max(1, round(WEIGHT_SCALE * p)) for p in probs]
+
+
+def book_moves(agent, board):
+    "(move, weight) pairs the agent plays in this position"
+    ll = agent.rank(board.fen())
+    return [(x[0], w) for x, w in zip(ll, move_weights(agent, len(ll)))]
+
+
+def raw_move(board, move):
+    "Polyglot move encoding, castling is written as king takes rook"
+    to_square = move.to_square
+    if board.is_castling(move):
+        to_square = CASTLING_ROOKS[to_square]
+    promotion = move.promotion - 1 if move.promotion else 0
+    return to_square | move.from_square << 6 | promotion << 12
+
+
+def build_book(agent_id, plies, maxplies=None, opponents=None):
+    "Polyglot entries (key, raw move, weight) for the first plies of both colours' games"
+    agents = {}
+    for colour in (c.WHITE, c.BLACK):
+        agent = AGENT_MAPPING[agent_id]('white' if colour == c.WHITE else 'black')
+        if maxplies is not None:
+            agent.QPLIES += maxplies - agent.MAXPLIES
+            agent.MAXPLIES = maxplies
+        agents[colour] = agent
+    opponent_agents = {}
+    if opponents is not None:
+        for colour in (c.WHITE, c.BLACK):
+            opponent_agents[colour] = [AGENT_MAPPING[o]('white' if colour == c.WHITE else 'black') for o in opponents]
+
+    entries = {}  # position key -> [(raw move, weight)]
+    seen = {}  # (position key, colour) -> shallowest ply the position was explored at
+    moves_cache = {}  # (position key, colour) -> moves followed from the position, searched only once
+    board = c.Board()
+
+    def explore(ply, colour):
+        "Follow the agent's moves and the opponent's replies when the agent plays colour"
+        if ply >= plies or board.is_game_over(claim_draw=True):
+            return
+        key = chess.polyglot.zobrist_hash(board)
+        # a position first reached near the ply limit is explored again from a shallower ply
+        if seen.get((key, colour), plies) <= ply:
+            return
+        seen[(key, colour)] = ply
+        if (key, colour) in moves_cache:
+            nxt = moves_cache[(key, colour)]
+        elif board.turn == colour:
+            moves = book_moves(agents[colour], board)
+            entries[key] = [(raw_move(board, m), w) for m, w in moves]
+            nxt = [m for m, w in moves]
+        elif opponent_agents:
+            nxt = []
+            for opponent in opponent_agents[board.turn]:
+                for m, w in book_moves(opponent, board):
+                    if m not in nxt:
+                        nxt.append(m)
+        else:
+            nxt = list(board.legal_moves)
+        moves_cache[(key, colour)] = nxt
+        for m in nxt:
+            board.push(m)
+            explore(ply + 1, colour)
+            board.pop()
+
+    for colour in (c.WHITE, c.BLACK):
+        explore(0, colour)
+    return sorted(((key, move, weight) for key, moves in entries.items() for move, weight in moves),
+                  key=lambda e: (e[0], -e[2]))
+
+
+def write_book(entries, path):
+    with open(path, 'wb') as f:
+        for key, move, weight in entries:
+            f.write(chess.polyglot.ENTRY_STRUCT.pack(key, move, weight, 0))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build Polyglot opening books for the Turochamp agents')
+    parser.add_argument('agents', nargs='*', help='agent ids from AGENT_MAPPING (default: all)')
+    parser.add_argument('--plies', type=int, default=6, help='book depth in plies')
+    parser.add_argument('--maxplies', type=int, default=None, help='search depth, default is the agent\'s MAXPLIES')
+    parser.add_argument('--opponents', nargs='*', default=None,
+                        help='only follow replies these agents would play (no ids: all agents), default: all legal replies')
+    parser.add_argument('--out', default='books', help='output directory, one <agent id>.bin per agent')
+    args = parser.parse_args()
+
+    opponents = args.opponents
+    if opponents is not None and not opponents:
+        opponents = list(AGENT_MAPPING.keys())
+    os.makedirs(args.out, exist_ok=True)
+    for agent_id in args.agents or list(AGENT_MAPPING.keys()):
+        entries = build_book(agent_id, args.plies, args.maxplies, opponents)
+        path = os.path.join(args.out, agent_id + '.bin')
+        write_book(entries, path)
+        print(agent_id, len(entries), 'entries ->', path)
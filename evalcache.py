@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+# Bounded caches for the Turochamp evaluation (see pyturochamp.py)
+
+from collections import OrderedDict
+
+
+class BoundedCache:
+    "Mapping of at most maxsize entries, least recently used entry evicted first; maxsize 0 disables it"
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        "Cached value for key, or None"
+        value = self.data.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if not self.maxsize:
+            return
+        self.data[key] = value
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+            self.evictions += 1
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        while len(self.data) > maxsize:
+            self.data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.data.clear()
+        self.reset_stats()
+
+    def reset_stats(self):
+        "Zero the counters but keep the entries"
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self.data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit rate': self.hits / total if total else 0,
+        }
@@ -1,36 +1,128 @@
+import os
 import pandas as pd
 import chess
 import chess.pgn
 from agents import *
 from pyturochamp import *  # has different settings for the turochamp in each class
 from pathos.multiprocessing import ProcessingPool as Pool
+from profiling import Profiler, merge, report
+
+# Evaluation cache sizes per worker process, in entries (0 disables), see POS_CACHE/VAL_CACHE in pyturochamp.py
+POS_CACHE_SIZE = 20000  # getpos, evaluated at the root of every move
+VAL_CACHE_SIZE = 100000  # getval, evaluated at every search leaf
+# Directory of opening books built by book.py (<agent id>.bin), None = agents search every move
+BOOK_DIR = None
+# Profiling (see profiling.py): None = off, 'deterministic' (cProfile) or 'sampled' (stack sampling, Unix only)
+PROFILE = None
+PROFILE_SCOPE = 'agent'  # 'agent': only move selection, per agent id; 'worker': whole games, per worker process
+PROFILE_OUTPUT = 'profile'  # report file prefix
+# Adjudication, None disables a rule. Material is White - Black in pawns with the base Turochamp piece values
+RESIGN_MATERIAL = None  # e.g. 10: a side resigns when down at least this much material...
+RESIGN_PLIES = 10  # ...for this many consecutive plies
+DRAW_MATERIAL = None  # e.g. 0: the game is drawn when the material difference stays within this...
+DRAW_PLIES = 20  # ...for this many consecutive plies...
+DRAW_MIN_MOVES = 40  # ...counted from this move number on
+MAX_MOVES = None  # e.g. 200: hard cap on the number of moves, the game is drawn
+MATERIAL_VALUES = {chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3.5, chess.ROOK: 5, chess.QUEEN: 10}
 
 
 def play_game_wrapper(args):
     return play_game(*args)
 
 
+def material(board):
+    "Material balance of the board, White - Black"
+    return sum(value * (len(board.pieces(piece_type, chess.WHITE)) - len(board.pieces(piece_type, chess.BLACK)))
+               for piece_type, value in MATERIAL_VALUES.items())
+
+
+def adjudicate(board, streaks):
+    """Apply the adjudication rules to the current position, streaks holds the consecutive plies counted so far.
+    Returns (reason, winner) when the game should stop, otherwise None"""
+    if MAX_MOVES is not None and board.fullmove_number > MAX_MOVES:
+        return 'move cap', None
+    if RESIGN_MATERIAL is None and DRAW_MATERIAL is None:
+        return None
+    balance = material(board)
+    if RESIGN_MATERIAL is not None:
+        streaks[chess.WHITE] = streaks[chess.WHITE] + 1 if balance >= RESIGN_MATERIAL else 0
+        streaks[chess.BLACK] = streaks[chess.BLACK] + 1 if balance <= -RESIGN_MATERIAL else 0
+        for winner in (chess.WHITE, chess.BLACK):
+            if streaks[winner] >= RESIGN_PLIES:
+                return 'resignation', winner
+    if DRAW_MATERIAL is not None:
+        if board.fullmove_number >= DRAW_MIN_MOVES and abs(balance) <= DRAW_MATERIAL:
+            streaks[None] += 1
+        else:
+            streaks[None] = 0
+        if streaks[None] >= DRAW_PLIES:
+            return 'draw', None
+    return None
+
+
+def result_string(winner):
+    "PGN result for winner (None: draw)"
+    return '1/2-1/2' if winner is None else '1-0' if winner else '0-1'
+
+
 def play_game(white_id, black_id):
     # Other logical code for non-Turochamp agents has been removed
+    POS_CACHE.resize(POS_CACHE_SIZE)
+    VAL_CACHE.resize(VAL_CACHE_SIZE)
+    # the caches outlive the game in this worker, count only this game's lookups
+    POS_CACHE.reset_stats()
+    VAL_CACHE.reset_stats()
     white = AGENT_MAPPING[white_id]('white')
     black = AGENT_MAPPING[black_id]('black')
+    if BOOK_DIR:
+        for agent, agent_id in ((white, white_id), (black, black_id)):
+            path = os.path.join(BOOK_DIR, agent_id + '.bin')
+            if os.path.exists(path):
+                agent.BOOKFILE = path
+
+    profiler = Profiler(PROFILE) if PROFILE else None
+    if profiler:
+        white.PROFILE = black.PROFILE = True
+        if PROFILE_SCOPE == 'worker':
+            profiler.start('worker %d' % os.getpid())
 
     board = chess.Board()
+    adjudication = None
+    streaks = {chess.WHITE: 0, chess.BLACK: 0, None: 0}
     start_time = time.time()  # Capture the start time
     while not board.is_game_over(claim_draw=True):
+        adjudication = adjudicate(board, streaks)
+        if adjudication:
+            break
         player = white if board.turn else black
-        move_uci = player(board.fen())
+        if profiler and PROFILE_SCOPE == 'agent':
+            move_uci = profiler.run(white_id if board.turn else black_id, player, board.fen())
+        else:
+            move_uci = player(board.fen())
         move = chess.Move.from_uci(move_uci)
         board.push(move)
     end_time = time.time()  # Capture the end time
+    profile = None
+    if profiler:
+        if PROFILE_SCOPE == 'worker':
+            profiler.stop()
+        profile = profiler.data({white_id: white.timers, black_id: black.timers})
     game_duration = end_time - start_time  # Calculate the duration in seconds
     game = chess.pgn.Game.from_board(board)
     game.headers["White"] = white_id
     game.headers["Black"] = black_id
-    outcome = board.outcome(claim_draw=True)
+    # outcome is None for adjudicated games, adjudication holds (reason, winner) instead
+    outcome = None if adjudication else board.outcome(claim_draw=True)
+    if adjudication:
+        game.headers["Result"] = result_string(adjudication[1])
+        game.headers["Termination"] = "adjudication"
     print(white_id, 'vs', black_id)
-    print(outcome)
-    return white_id, black_id, outcome, game_duration
+    if adjudication:
+        print('adjudicated:', adjudication[0], result_string(adjudication[1]))
+    else:
+        print(outcome)
+    cache_stats = {'getpos': POS_CACHE.stats(), 'getval': VAL_CACHE.stats()}
+    return white_id, black_id, outcome, adjudication, game_duration, profile, cache_stats
 
 AGENT_MAPPING = {
     'Turochamp': lambda colour: Turochamp(colour),
@@ -65,24 +157,33 @@ if __name__ == "__main__":
     pool.join()
 
     # Table Setup
-    columns = ['Agent', 'Wins', 'Losses', 'Draws by Repetition', 'Other Draws', 'Total Games',
+    columns = ['Agent', 'Wins', 'Losses', 'Draws by Repetition', 'Other Draws', 'Adjudicated Games', 'Total Games',
                'Total Game Lengths']
     results_df = pd.DataFrame(columns=columns).set_index('Agent').astype({'Total Game Lengths': 'float64'})
 
     # Ensure all agents are represented in the DataFrame, even if they don't play
     for agent_id in agent_ids:
-        results_df.loc[agent_id] = [0, 0, 0, 0, 0, 0]
+        results_df.loc[agent_id] = [0, 0, 0, 0, 0, 0, 0]
 
     # Process the results
-    for white_id, black_id, outcome, game_duration in results:
-        if outcome.winner is None:  # Draw
-            if outcome.termination == chess.Termination.THREEFOLD_REPETITION:
+    games = []
+    for white_id, black_id, outcome, adjudication, game_duration, profile, cache_stats in results:
+        if adjudication:
+            reason, winner = adjudication
+            games.append([white_id, black_id, result_string(winner), 'adjudication: ' + reason, game_duration])
+            results_df.loc[white_id, 'Adjudicated Games'] += 1
+            results_df.loc[black_id, 'Adjudicated Games'] += 1
+        else:
+            winner = outcome.winner
+            games.append([white_id, black_id, outcome.result(), outcome.termination.name, game_duration])
+        if winner is None:  # Draw
+            if outcome and outcome.termination == chess.Termination.THREEFOLD_REPETITION:
                 results_df.loc[white_id, 'Draws by Repetition'] += 1
                 results_df.loc[black_id, 'Draws by Repetition'] += 1
             else:
                 results_df.loc[white_id, 'Other Draws'] += 1
                 results_df.loc[black_id, 'Other Draws'] += 1
-        elif outcome.winner:  # (.winner is an optional and color is bool true for white as defined in chess package)
+        elif winner:  # (.winner is an optional and color is bool true for white as defined in chess package)
             results_df.loc[white_id, 'Wins'] += 1
             results_df.loc[black_id, 'Losses'] += 1
         else:  # Black wins
@@ -98,6 +199,23 @@ if __name__ == "__main__":
     results_df['Average Game Length'] = results_df['Total Game Lengths'] / results_df['Total Games']
 
     results_df.to_csv('NewResults.csv', index=True)
+    games_df = pd.DataFrame(games, columns=['White', 'Black', 'Result', 'Termination', 'Game Length'])
+    games_df.to_csv('NewGames.csv', index=False)
+    # Evaluation cache totals over all games; size is the largest any worker's cache reached
+    cache_rows = []
+    for name in ('getpos', 'getval'):
+        stats = [result[-1][name] for result in results]
+        hits = sum(s['hits'] for s in stats)
+        misses = sum(s['misses'] for s in stats)
+        cache_rows.append([name, stats[0]['maxsize'] if stats else 0, max((s['size'] for s in stats), default=0),
+                           hits, misses, sum(s['evictions'] for s in stats), hits / (hits + misses) if hits + misses else 0])
+    cache_df = pd.DataFrame(cache_rows, columns=['Cache', 'Max Size', 'Size', 'Hits', 'Misses', 'Evictions', 'Hit Rate'])
+    cache_df.to_csv('NewCacheStats.csv', index=False)
+    print(cache_df.to_string(index=False))
+
+    if PROFILE:
+        report(merge([result[5] for result in results]), PROFILE_OUTPUT)
+        print('Profile written to', PROFILE_OUTPUT + '.txt')
     end_runtime = time.time()  # Capture the end time
     runtime = end_runtime - begin_runtime  # Calculate the duration in seconds
     print('Runtime:', runtime)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+# Opt-in profiling for agents and tournament runs (switched on with PROFILE in main.py)
+# Deterministic mode uses cProfile, sampled mode records call stacks on a CPU-time timer (Unix only) and writes them
+# in the folded format read by flamegraph.pl and speedscope. Each worker returns its data with the game results,
+# merge() and report() turn them into one report at the end of the tournament.
+
+import cProfile
+import os
+import pstats
+import signal
+from collections import Counter
+from time import perf_counter
+
+from searchboard import SearchBoard
+
+
+def timed(timers, name, fn):
+    "Wrap fn so its number of calls and total time are added to timers[name]"
+    entry = timers.setdefault(name, [0, 0.0])
+
+    def wrapper(*args):
+        t = perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            entry[0] += 1
+            entry[1] += perf_counter() - t
+    return wrapper
+
+
+class TimedSearchBoard(SearchBoard):
+    "SearchBoard that adds the calls and time of result() to timers['result']"
+
+    __slots__ = ('timers',)
+
+    def __init__(self, board, timers):
+        super().__init__(board)
+        self.timers = timers
+        timers.setdefault('result', [0, 0.0])
+
+    def result(self, claim_draw=False):
+        t = perf_counter()
+        try:
+            return super().result(claim_draw)
+        finally:
+            entry = self.timers['result']
+            entry[0] += 1
+            entry[1] += perf_counter() - t
+
+
+class Profiler:
+    "Profiles code between start(label) and stop(), separately for each label (agent id or worker)"
+
+    def __init__(self, mode, interval=0.001):
+        if mode not in ('deterministic', 'sampled'):
+            raise ValueError(f"unknown profiling mode {mode!r}, expected 'deterministic' or 'sampled'")
+        self.mode = mode
+        self.interval = interval
+        self.label = None
+        self.profiles = {}  # label -> cProfile.Profile
+        self.stacks = Counter()  # folded call stack -> samples
+
+    def start(self, label):
+        self.label = label
+        if self.mode == 'deterministic':
+            if label not in self.profiles:
+                self.profiles[label] = cProfile.Profile()
+            self.profiles[label].enable()
+        else:
+            signal.signal(signal.SIGPROF, self._sample)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        if self.mode == 'deterministic':
+            self.profiles[self.label].disable()
+        else:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+
+    def run(self, label, fn, *args):
+        self.start(label)
+        try:
+            return fn(*args)
+        finally:
+            self.stop()
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+            frame = frame.f_back
+        stack.append(self.label)
+        self.stacks[';'.join(reversed(stack))] += 1
+
+    def data(self, timers):
+        "Picklable profile of this worker; timers maps agent id to the agent's timers"
+        stats = {}
+        for label, profile in self.profiles.items():
+            profile.create_stats()
+            stats[label] = profile.stats
+        return {'mode': self.mode, 'worker': os.getpid(), 'stats': stats, 'stacks': self.stacks, 'timers': timers}
+
+
+class _Stats:
+    "Raw cProfile stats in the form pstats.Stats accepts"
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def merge(datas):
+    "Merge the profiles returned by every game"
+    merged = {'mode': None, 'workers': set(), 'stats': {}, 'stacks': Counter(), 'timers': {}}
+    for data in datas:
+        if data is None:
+            continue
+        merged['mode'] = data['mode']
+        merged['workers'].add(data['worker'])
+        for label, stats in data['stats'].items():
+            if not stats:
+                continue
+            if label in merged['stats']:
+                merged['stats'][label].add(_Stats(stats))
+            else:
+                merged['stats'][label] = pstats.Stats(_Stats(stats))
+        merged['stacks'].update(data['stacks'])
+        for agent_id, timers in data['timers'].items():
+            total = merged['timers'].setdefault(agent_id, {})
+            for name, (calls, seconds) in timers.items():
+                entry = total.setdefault(name, [0, 0.0])
+                entry[0] += calls
+                entry[1] += seconds
+    return merged
+
+
+def report(merged, prefix):
+    """Write prefix.txt (timers and hottest functions), plus prefix.prof (all cProfile stats, deterministic mode)
+    or prefix.folded (call stacks for a flamegraph, sampled mode)"""
+    with open(prefix + '.txt', 'w') as f:
+        f.write(f"{merged['mode']} profile of {len(merged['workers'])} worker(s)\n\n")
+        f.write(f"{'Agent':<24}{'Function':<10}{'Calls':>12}{'Total s':>12}{'us/call':>10}\n")
+        for agent_id, timers in sorted(merged['timers'].items()):
+            for name, (calls, seconds) in sorted(timers.items()):
+                f.write(f"{agent_id:<24}{name:<10}{calls:>12}{seconds:>12.2f}{1e6 * seconds / max(calls, 1):>10.1f}\n")
+        if merged['stats']:
+            total = None
+            for label, stats in sorted(merged['stats'].items()):
+                f.write(f"\n==== {label} ====\n")
+                stats.stream = f
+                stats.sort_stats('cumulative').print_stats(30)
+                if total is None:
+                    total = pstats.Stats(_Stats(dict(stats.stats)))
+                else:
+                    total.add(stats)
+            total.dump_stats(prefix + '.prof')
+        if merged['stacks']:
+            own = Counter()
+            for stack, n in merged['stacks'].items():
+                own[stack.rsplit(';', 1)[-1]] += n
+            samples = sum(own.values())
+            f.write(f"\nHottest functions by own samples ({samples} samples)\n")
+            for function, n in own.most_common(30):
+                f.write(f"{100 * n / samples:>6.1f}%  {function}\n")
+            with open(prefix + '.folded', 'w') as folded:
+                for stack, n in sorted(merged['stacks'].items()):
+                    folded.write(f"{stack} {n}\n")
@@ -6,11 +6,20 @@
 # Modified to act as an agent, global variables modified to be class variables, gets colour at match start
 
 from pst import pst
+from searchboard import SearchBoard, move_from, move_to, popcount
+from evalcache import BoundedCache
+from profiling import timed, TimedSearchBoard
 
 import chess as c
+import chess.polyglot
 import math, time
 from random import random, expovariate, choice
 
+# Evaluation caches, shared by every agent in the process so entries carry across moves and games.
+# Keys include the parameters the cached terms depend on; use .resize() to change the number of entries (0 = off)
+POS_CACHE = BoundedCache(20000)  # getpos results (root positions) by position key
+VAL_CACHE = BoundedCache(100000)  # getval results (search leaves) by position key
+
 
 class Turochamp:
     def __init__(self, colour):
@@ -42,10 +51,71 @@ class Turochamp:
         self.EasyLambda = 2  # Larger lambda = higher probability of selecting best move
         self.PlayerAdvantage = 0  # Keep the evaluation at least this many decipawns in favor of the player
         self.NODES = 0  # For tracking the number of nodes
+        self.BOOKFILE = None  # Polyglot opening book made by book.py, None = always search
+        self.book = None
+        self.PROFILE = False  # Count calls and time of the evaluation and search helpers in self.timers
+        self.timers = {}
 
     def __call__(self, board_fen: str) -> str:
+        if self.BOOKFILE:
+            move = self.bookmove(c.Board(board_fen))
+            if move:
+                return move
+        ll = self.rank(board_fen)
+        i = self.getindex(ll)
+        # print('# %.2f %s' % (ll[i][1] + ll[i][2], [str(ll[i][0])]))
+        # print('info depth %d seldepth %d score cp %d time %d nodes %d pv %s' % (MAXPLIES + 1, QPLIES + 1,
+        # 	100 * pm () * ll[i][2], 1000 * (time.time() - start), NODES, str(ll[i][0])))
+        return str(ll[i][0])
+
+    def bookmove(self, b):
+        "Get a move from the opening book, random variants pick by the book weights; None when out of book"
+        if self.book is None:
+            self.book = c.polyglot.open_reader(self.BOOKFILE)
+        try:
+            if self.EasyLearn > 1:
+                entry = self.book.weighted_choice(b)
+            else:
+                entry = self.book.find(b)
+        except IndexError:
+            return None
+        return entry.move.uci()
+
+    def getindex(self, ll):
+        "Select either the best move or another move if easy play UCI parameters are set"
+        if random() < (self.BlunderPercent / 100.):
+            err = self.BlunderError / 10.
+        else:
+            err = self.MoveError / 10.
+        if self.EasyLearn > 1:
+            ind = int(expovariate(self.EasyLambda))
+            return min(ind, len(ll) - 1, self.EasyLearn - 1)
+        if err == 0 and self.PlayerAdvantage == 0:
+            return 0  # best move
+        else:
+            vals = [x[2] for x in ll]
+            inds = list(zip(vals, range(len(ll))))
+            mm = [x for x in inds if (abs(x[0] - vals[0]) < err)]
+            if self.COMPC == c.WHITE:
+                ma = [x for x in inds if x[0] <= -self.PlayerAdvantage / 10.]
+            else:
+                ma = [x for x in inds if x[0] >= self.PlayerAdvantage / 10.]
+            if len(ma) == 0:
+                ma = [x for x in inds if x[0] == 0]
+            if self.PlayerAdvantage != 0 and len(ma) > 0:
+                return ma[0][1]
+            elif err > 0 and len(mm) > 0:
+                return choice(mm)[1]
+            else:
+                return 0
+
+    def rank(self, board_fen: str) -> list:
+        "Search every legal move; returns (move, positional value, search value) tuples, best move first"
         b = c.Board(board_fen)
-        # Move return and getmove() call is at bottom of file
+        # Move list return and getmove() call is at bottom of file
+        # cache keys for the parameters getpos and getval depend on
+        posfp = ('pos', self.COMPC, self.PSTAB)
+        valfp = ('val', self.PAWN_VALUE, self.KNIGHT_VALUE, self.BISHOP_VALUE, self.ROOK_VALUE, self.QUEEN_VALUE)
 
         def sqrt(n):
             # Used Newton-Raphson to reduce execution time, final result is rounded so won't change outcome
@@ -58,7 +128,16 @@ class Turochamp:
                 y = (x + n / x) / 2
             return round(x, 1)
 
-        def getpos(b):
+        def getpos(b, key):
+            "Get positional-play value for a board, key is its SearchBoard position key"
+            k = (posfp, key)
+            ppv = POS_CACHE.get(k)
+            if ppv is None:
+                ppv = getpos1(b)
+                POS_CACHE.put(k, ppv)
+            return ppv
+
+        def getpos1(b):
             "Get positional-play value for a board"
             ppv = 0
             if not len(list(b.legal_moves)) and b.is_checkmate():
@@ -145,11 +224,11 @@ class Turochamp:
         def getval1(b):
             "Get total piece value of board (White - Black, the usual method)"
             return (
-                    self.PAWN_VALUE * len(b.pieces(c.PAWN, c.WHITE)) - len(b.pieces(c.PAWN, c.BLACK))
-                    + self.KNIGHT_VALUE * (len(b.pieces(c.KNIGHT, c.WHITE)) - len(b.pieces(c.KNIGHT, c.BLACK)))
-                    + self.BISHOP_VALUE * (len(b.pieces(c.BISHOP, c.WHITE)) - len(b.pieces(c.BISHOP, c.BLACK)))
-                    + self.ROOK_VALUE * (len(b.pieces(c.ROOK, c.WHITE)) - len(b.pieces(c.ROOK, c.BLACK)))
-                    + self.QUEEN_VALUE * (len(b.pieces(c.QUEEN, c.WHITE)) - len(b.pieces(c.QUEEN, c.BLACK)))
+                    self.PAWN_VALUE * popcount(b.pieces_mask(c.PAWN, c.WHITE)) - popcount(b.pieces_mask(c.PAWN, c.BLACK))
+                    + self.KNIGHT_VALUE * (popcount(b.pieces_mask(c.KNIGHT, c.WHITE)) - popcount(b.pieces_mask(c.KNIGHT, c.BLACK)))
+                    + self.BISHOP_VALUE * (popcount(b.pieces_mask(c.BISHOP, c.WHITE)) - popcount(b.pieces_mask(c.BISHOP, c.BLACK)))
+                    + self.ROOK_VALUE * (popcount(b.pieces_mask(c.ROOK, c.WHITE)) - popcount(b.pieces_mask(c.ROOK, c.BLACK)))
+                    + self.QUEEN_VALUE * (popcount(b.pieces_mask(c.QUEEN, c.WHITE)) - popcount(b.pieces_mask(c.QUEEN, c.BLACK)))
             )
 
         # elected not to use this to avoid run time becoming longer with division operations
@@ -174,8 +253,12 @@ class Turochamp:
 
         def getval(b):
             "Get total piece value of board"
-
-            return getval1(b)
+            k = (valfp, b.key)
+            v = VAL_CACHE.get(k)
+            if v is None:
+                v = getval1(b)
+                VAL_CACHE.put(k, v)
+            return v
 
         def isdead(b, ml, p):
             "Is the position dead? (quiescence)"
@@ -184,7 +267,7 @@ class Turochamp:
             if b.is_check():
                 return False
             x = b.pop()
-            if (b.is_capture(x) and len(b.attackers(not b.turn, x.to_square))) or b.is_check():
+            if (b.is_capture(x) and b.attackers_mask(not b.turn, move_to(x))) or b.is_check():
                 b.push(x)
                 return False
             else:
@@ -263,18 +346,18 @@ class Turochamp:
         def order(b, ply):
             "Move ordering"
             if ply > 0:
-                return list(b.legal_moves)
+                return b.legal_moves()
             am, bm = [], []
-            for x in b.legal_moves:
+            for x in b.legal_moves():
                 if b.is_capture(x):
-                    if b.piece_at(x.to_square):
+                    if b.piece_type_at(move_to(x)):
                         # MVV/LVA sorting (http://home.hccnet.nl/h.g.muller/mvv.html)
-                        am.append((x, 10 * b.piece_at(x.to_square).piece_type
-                                   - b.piece_at(x.from_square).piece_type))
+                        am.append((x, 10 * b.piece_type_at(move_to(x))
+                                   - b.piece_type_at(move_from(x))))
                     else:  # to square is empty during en passant capture
-                        am.append((x, 10 - b.piece_at(x.from_square).piece_type))
+                        am.append((x, 10 - b.piece_type_at(move_from(x))))
                 else:
-                    am.append((x, b.piece_at(x.from_square).piece_type))
+                    am.append((x, b.piece_type_at(move_from(x))))
             am.sort(key=lambda m: m[1])
             am.reverse()
             bm = [q[0] for q in am]
@@ -286,37 +369,11 @@ class Turochamp:
             else:
                 return -1
 
-        def getindex(ll):
-            "Select either the best move or another move if easy play UCI parameters are set"
-            if random() < (self.BlunderPercent / 100.):
-                err = self.BlunderError / 10.
-            else:
-                err = self.MoveError / 10.
-            if self.EasyLearn > 1:
-                ind = int(expovariate(self.EasyLambda))
-                return min(ind, len(ll) - 1, self.EasyLearn - 1)
-            if err == 0 and self.PlayerAdvantage == 0:
-                return 0  # best move
-            else:
-                vals = [x[2] for x in ll]
-                inds = list(zip(vals, range(len(ll))))
-                mm = [x for x in inds if (abs(x[0] - vals[0]) < err)]
-                if self.COMPC == c.WHITE:
-                    ma = [x for x in inds if x[0] <= -self.PlayerAdvantage / 10.]
-                else:
-                    ma = [x for x in inds if x[0] >= self.PlayerAdvantage / 10.]
-                if len(ma) == 0:
-                    ma = [x for x in inds if x[0] == 0]
-                if self.PlayerAdvantage != 0 and len(ma) > 0:
-                    return ma[0][1]
-                elif err > 0 and len(mm) > 0:
-                    return choice(mm)[1]
-                else:
-                    return 0
-
         def getmove(b):
-            "Get move list for board"
-            lastpos = getpos(b)
+            "Get sorted move list for board"
+            # the search itself runs on the lean board, b is only used for getpos
+            sb = TimedSearchBoard(b, self.timers) if self.PROFILE else SearchBoard(b)
+            lastpos = getpos(b, sb.key)
             ll = []
 
             # if not silent:
@@ -332,8 +389,9 @@ class Turochamp:
                     castle = pm()
                 else:
                     castle = 0
+                sb.push(sb.from_chess(x))
                 b.push(x)
-                p = getpos(b) - lastpos + castle
+                p = getpos(b, sb.key) - lastpos + castle
                 cr = b.has_castling_rights(self.COMPC)
                 if cr0 == True and cr == True:  # can we still castle later?
                     p += pm()
@@ -342,21 +400,24 @@ class Turochamp:
                         p += pm()
 
                 if self.COMPC == c.WHITE:
-                    t = searchmin(b, 0, -1e6, 1e6)
+                    t = searchmin(sb, 0, -1e6, 1e6)
                 else:
-                    t = searchmax(b, 0, -1e6, 1e6)
+                    t = searchmax(sb, 0, -1e6, 1e6)
                 # if not silent:
                 # 	print("(%u/%u) %s %.1f %.2f" % (n + 1, nl, x, p, t))
                 ll.append((x, p, t))
                 b.pop()
+                sb.pop()
             ll.sort(key=lambda m: m[1] + 1000 * m[2])
             if self.COMPC == c.WHITE:
                 ll.reverse()
-            i = getindex(ll)
-            # print('# %.2f %s' % (ll[i][1] + ll[i][2], [str(ll[i][0])]))
-            # print('info depth %d seldepth %d score cp %d time %d nodes %d pv %s' % (MAXPLIES + 1, QPLIES + 1,
-            # 	100 * pm () * ll[i][2], 1000 * (time.time() - start), NODES, str(ll[i][0])))
-            return str(ll[i][0])
+            return ll
+
+        if self.PROFILE:
+            getpos = timed(self.timers, 'getpos', getpos)
+            getval = timed(self.timers, 'getval', getval)
+            order = timed(self.timers, 'order', order)
+            isdead = timed(self.timers, 'isdead', isdead)
 
         return getmove(b)
 
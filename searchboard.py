@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+
+# Minimal board used by the Turochamp search (see pyturochamp.py)
+# Integer bitboards, python-chess's precomputed attack tables and an incremental Zobrist key,
+# moves are plain ints so push/pop only save what is needed to undo them.
+# Built from a chess.Board at the root, standard chess only.
+
+import chess as c
+from chess.polyglot import POLYGLOT_RANDOM_ARRAY
+
+BB_SQUARES = c.BB_SQUARES
+BB_PAWN_ATTACKS = c.BB_PAWN_ATTACKS
+BB_KNIGHT_ATTACKS = c.BB_KNIGHT_ATTACKS
+BB_KING_ATTACKS = c.BB_KING_ATTACKS
+BB_RANK_MASKS, BB_RANK_ATTACKS = c.BB_RANK_MASKS, c.BB_RANK_ATTACKS
+BB_FILE_MASKS, BB_FILE_ATTACKS = c.BB_FILE_MASKS, c.BB_FILE_ATTACKS
+BB_DIAG_MASKS, BB_DIAG_ATTACKS = c.BB_DIAG_MASKS, c.BB_DIAG_ATTACKS
+BB_ALL = c.BB_ALL
+between, ray, popcount = c.between, c.ray, c.popcount
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = c.PAWN, c.KNIGHT, c.BISHOP, c.ROOK, c.QUEEN, c.KING
+
+# Move encoding: from | to << 6 | promotion << 12, plus flags for the two special moves
+CASTLE = 1 << 15
+EP = 1 << 16
+PROMOTIONS = (QUEEN, ROOK, BISHOP, KNIGHT)  # same order as python-chess generates them
+
+# Zobrist keys, Polyglot layout: piece kind (black pawn = 0, white pawn = 1, ...) * 64 + square
+Z_PIECE = [[[0] * 64] + [POLYGLOT_RANDOM_ARRAY[64 * (2 * (pt - 1) + colour):64 * (2 * (pt - 1) + colour) + 64]
+                         for pt in range(1, 7)] for colour in (c.BLACK, c.WHITE)]
+Z_CASTLE = {c.H1: POLYGLOT_RANDOM_ARRAY[768], c.A1: POLYGLOT_RANDOM_ARRAY[769],
+            c.H8: POLYGLOT_RANDOM_ARRAY[770], c.A8: POLYGLOT_RANDOM_ARRAY[771]}
+Z_EP = POLYGLOT_RANDOM_ARRAY[772:780]
+Z_TURN = POLYGLOT_RANDOM_ARRAY[780]
+
+
+def move_from(m):
+    return m & 63
+
+
+def move_to(m):
+    return m >> 6 & 63
+
+
+def scan_reversed(bb):
+    while bb:
+        r = bb.bit_length() - 1
+        yield r
+        bb ^= BB_SQUARES[r]
+
+
+class SearchBoard:
+    "Search-only position; draw and repetition rules follow chess.Board.result(claim_draw=True)"
+
+    __slots__ = ('bbs', 'occ_co', 'occupied', 'types', 'turn', 'castling', 'ep_square', 'ep_hashed',
+                 'halfmove_clock', 'key', 'history', 'start', 'stack', '_legal')
+
+    def __init__(self, board: c.Board):
+        self.bbs = [0, board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings]
+        self.occ_co = [board.occupied_co[c.BLACK], board.occupied_co[c.WHITE]]
+        self.occupied = board.occupied
+        self.types = [board.piece_type_at(sq) or 0 for sq in range(64)]
+        self.turn = board.turn
+        self.castling = board.clean_castling_rights()
+        self.ep_square = board.ep_square
+        self.ep_hashed = self.ep_square if board.has_legal_en_passant() else None
+        self.halfmove_clock = board.halfmove_clock
+        self.key = self.zobrist()
+        self.history = [self.key]  # keys of every position since the root
+        self.start = 0  # first history entry after the last irreversible move (repetition window)
+        self.stack = []
+        self._legal = None
+
+    def zobrist(self):
+        "Compute the position key from scratch (the search keeps it up to date incrementally)"
+        key = 0
+        for colour in (c.BLACK, c.WHITE):
+            for sq in scan_reversed(self.occ_co[colour]):
+                key ^= Z_PIECE[colour][self.types[sq]][sq]
+        for sq in scan_reversed(self.castling):
+            key ^= Z_CASTLE[sq]
+        if self.ep_hashed is not None:
+            key ^= Z_EP[self.ep_hashed & 7]
+        if self.turn == c.WHITE:
+            key ^= Z_TURN
+        return key
+
+    # Conversion ################################################################
+
+    def from_chess(self, move: c.Move):
+        "Encode a legal chess.Move for this position"
+        m = move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+        if self.types[move.from_square] == KING and abs((move.from_square & 7) - (move.to_square & 7)) > 1:
+            m |= CASTLE
+        elif (self.types[move.from_square] == PAWN and move.to_square == self.ep_square
+              and (move.from_square & 7) != (move.to_square & 7) and not self.types[move.to_square]):
+            m |= EP
+        return m
+
+    def to_chess(self, m):
+        return c.Move(m & 63, m >> 6 & 63, (m >> 12 & 7) or None)
+
+    # Queries ###################################################################
+
+    def pieces_mask(self, piece_type, colour):
+        return self.bbs[piece_type] & self.occ_co[colour]
+
+    def piece_type_at(self, square):
+        return self.types[square]
+
+    def attacks_mask(self, square, occupied=None):
+        "Squares attacked by the piece on square"
+        pt = self.types[square]
+        if pt == PAWN:
+            return BB_PAWN_ATTACKS[bool(self.occ_co[c.WHITE] & BB_SQUARES[square])][square]
+        if pt == KNIGHT:
+            return BB_KNIGHT_ATTACKS[square]
+        if pt == KING:
+            return BB_KING_ATTACKS[square]
+        if occupied is None:
+            occupied = self.occupied
+        a = 0
+        if pt != ROOK:
+            a = BB_DIAG_ATTACKS[square][BB_DIAG_MASKS[square] & occupied]
+        if pt != BISHOP:
+            a |= (BB_RANK_ATTACKS[square][BB_RANK_MASKS[square] & occupied]
+                  | BB_FILE_ATTACKS[square][BB_FILE_MASKS[square] & occupied])
+        return a
+
+    def attackers_mask(self, colour, square, occupied=None):
+        if occupied is None:
+            occupied = self.occupied
+        bbs = self.bbs
+        queens_and_rooks = bbs[QUEEN] | bbs[ROOK]
+        queens_and_bishops = bbs[QUEEN] | bbs[BISHOP]
+        attackers = (
+            (BB_KING_ATTACKS[square] & bbs[KING])
+            | (BB_KNIGHT_ATTACKS[square] & bbs[KNIGHT])
+            | (BB_RANK_ATTACKS[square][BB_RANK_MASKS[square] & occupied] & queens_and_rooks)
+            | (BB_FILE_ATTACKS[square][BB_FILE_MASKS[square] & occupied] & queens_and_rooks)
+            | (BB_DIAG_ATTACKS[square][BB_DIAG_MASKS[square] & occupied] & queens_and_bishops)
+            | (BB_PAWN_ATTACKS[not colour][square] & bbs[PAWN]))
+        return attackers & self.occ_co[colour]
+
+    def king(self, colour):
+        return (self.bbs[KING] & self.occ_co[colour]).bit_length() - 1
+
+    def is_check(self):
+        return bool(self.attackers_mask(not self.turn, self.king(self.turn)))
+
+    def is_capture(self, m):
+        return bool(self.occ_co[not self.turn] & BB_SQUARES[m >> 6 & 63]) or bool(m & EP)
+
+    def is_zeroing(self, m):
+        return self.types[m & 63] == PAWN or bool(self.occ_co[not self.turn] & BB_SQUARES[m >> 6 & 63])
+
+    def is_castling(self, m):
+        return bool(m & CASTLE)
+
+    # Move generation ###########################################################
+
+    def legal_moves(self):
+        "Legal moves of the current position, cached until the next push/pop"
+        if self._legal is None:
+            self._legal = list(self._generate_legal())
+        return self._legal
+
+    def has_legal_move(self):
+        if self._legal is not None:
+            return bool(self._legal)
+        for _ in self._generate_legal():
+            return True
+        return False
+
+    def _generate_legal(self):
+        "Pseudo-legal moves, each checked for king safety only as it is yielded"
+        king = self.king(self.turn)
+        blockers = self._slider_blockers(king)
+        checkers = self.attackers_mask(not self.turn, king)
+        if checkers:
+            moves = self._generate_evasions(king, checkers)
+        else:
+            moves = self._generate_pseudo_legal(BB_ALL, BB_ALL)
+        for m in moves:
+            if self._is_safe(king, blockers, m):
+                yield m
+
+    def _generate_pseudo_legal(self, from_mask, to_mask):
+        turn = self.turn
+        our = self.occ_co[turn]
+        pawns = self.bbs[PAWN] & our & from_mask
+        for frm in scan_reversed(our & ~self.bbs[PAWN] & from_mask):
+            for to in scan_reversed(self.attacks_mask(frm) & ~our & to_mask):
+                yield frm | to << 6
+        if from_mask & self.bbs[KING]:
+            yield from self._generate_castling(from_mask, to_mask)
+        if not pawns:
+            return
+        their = self.occ_co[not turn]
+        for frm in scan_reversed(pawns):
+            for to in scan_reversed(BB_PAWN_ATTACKS[turn][frm] & their & to_mask):
+                if to >> 3 in (0, 7):
+                    for promotion in PROMOTIONS:
+                        yield frm | to << 6 | promotion << 12
+                else:
+                    yield frm | to << 6
+        if turn == c.WHITE:
+            single_moves = pawns << 8 & ~self.occupied
+            double_moves = single_moves << 8 & ~self.occupied & (c.BB_RANK_3 | c.BB_RANK_4)
+            step = -8
+        else:
+            single_moves = pawns >> 8 & ~self.occupied
+            double_moves = single_moves >> 8 & ~self.occupied & (c.BB_RANK_6 | c.BB_RANK_5)
+            step = 8
+        for to in scan_reversed(single_moves & to_mask):
+            frm = to + step
+            if to >> 3 in (0, 7):
+                for promotion in PROMOTIONS:
+                    yield frm | to << 6 | promotion << 12
+            else:
+                yield frm | to << 6
+        for to in scan_reversed(double_moves & to_mask):
+            yield to + 2 * step | to << 6
+        if self.ep_square:
+            yield from self._generate_ep(from_mask, to_mask)
+
+    def _generate_ep(self, from_mask, to_mask):
+        ep = self.ep_square
+        if not BB_SQUARES[ep] & to_mask or BB_SQUARES[ep] & self.occupied:
+            return
+        capturers = (self.bbs[PAWN] & self.occ_co[self.turn] & from_mask
+                     & BB_PAWN_ATTACKS[not self.turn][ep] & c.BB_RANKS[4 if self.turn else 3])
+        for frm in scan_reversed(capturers):
+            yield frm | ep << 6 | EP
+
+    def _generate_castling(self, from_mask, to_mask):
+        backrank = c.BB_RANK_1 if self.turn == c.WHITE else c.BB_RANK_8
+        king = self.occ_co[self.turn] & self.bbs[KING] & backrank & from_mask
+        if not king:
+            return
+        king_sq = king.bit_length() - 1
+        for candidate in scan_reversed(self.castling & backrank & to_mask):
+            rook = BB_SQUARES[candidate]
+            a_side = rook < king
+            king_to = (c.BB_FILE_C if a_side else c.BB_FILE_G) & backrank
+            rook_to = (c.BB_FILE_D if a_side else c.BB_FILE_F) & backrank
+            king_to_sq = king_to.bit_length() - 1
+            king_path = between(king_sq, king_to_sq)
+            rook_path = between(candidate, rook_to.bit_length() - 1)
+            if not ((self.occupied ^ king ^ rook) & (king_path | rook_path | king_to | rook_to)
+                    or self._attacked_for_king(king_path | king, self.occupied ^ king)
+                    or self._attacked_for_king(king_to, self.occupied ^ king ^ rook ^ rook_to)):
+                yield king_sq | king_to_sq << 6 | CASTLE
+
+    def _attacked_for_king(self, path, occupied):
+        return any(self.attackers_mask(not self.turn, sq, occupied) for sq in scan_reversed(path))
+
+    def _generate_evasions(self, king, checkers):
+        bbs = self.bbs
+        sliders = checkers & (bbs[BISHOP] | bbs[ROOK] | bbs[QUEEN])
+        attacked = 0
+        for checker in scan_reversed(sliders):
+            attacked |= ray(king, checker) & ~BB_SQUARES[checker]
+        for to in scan_reversed(BB_KING_ATTACKS[king] & ~self.occ_co[self.turn] & ~attacked):
+            yield king | to << 6
+        checker = checkers.bit_length() - 1
+        if BB_SQUARES[checker] == checkers:
+            # capture or block a single checker
+            target = between(king, checker) | checkers
+            yield from self._generate_pseudo_legal(~bbs[KING], target)
+            # capture the checking pawn en passant
+            if self.ep_square and not BB_SQUARES[self.ep_square] & target:
+                last_double = self.ep_square + (-8 if self.turn == c.WHITE else 8)
+                if last_double == checker:
+                    yield from self._generate_ep(BB_ALL, BB_ALL)
+
+    def _slider_blockers(self, king):
+        bbs = self.bbs
+        rooks_and_queens = bbs[ROOK] | bbs[QUEEN]
+        bishops_and_queens = bbs[BISHOP] | bbs[QUEEN]
+        snipers = ((BB_RANK_ATTACKS[king][0] & rooks_and_queens)
+                   | (BB_FILE_ATTACKS[king][0] & rooks_and_queens)
+                   | (BB_DIAG_ATTACKS[king][0] & bishops_and_queens))
+        blockers = 0
+        for sniper in scan_reversed(snipers & self.occ_co[not self.turn]):
+            b = between(king, sniper) & self.occupied
+            if b and BB_SQUARES[b.bit_length() - 1] == b:
+                blockers |= b
+        return blockers & self.occ_co[self.turn]
+
+    def _is_safe(self, king, blockers, m):
+        frm = m & 63
+        if frm == king:
+            return bool(m & CASTLE) or not self.attackers_mask(not self.turn, m >> 6 & 63)
+        if m & EP:
+            return self._ep_legal(king, frm)
+        return not blockers & BB_SQUARES[frm] or bool(ray(frm, m >> 6 & 63) & BB_SQUARES[king])
+
+    def _ep_legal(self, king, capturer):
+        "Does capturing en passant with capturer leave the king safe?"
+        captured = BB_SQUARES[self.ep_square + (-8 if self.turn == c.WHITE else 8)]
+        occupied = self.occupied ^ BB_SQUARES[capturer] ^ captured | BB_SQUARES[self.ep_square]
+        return not self.attackers_mask(not self.turn, king, occupied) & ~captured
+
+    def _has_legal_ep(self):
+        if self.ep_square is None:
+            return False
+        king = self.king(self.turn)
+        return any(self._ep_legal(king, m & 63) for m in self._generate_ep(BB_ALL, BB_ALL))
+
+    # Make / unmake #############################################################
+
+    def _toggle(self, colour, piece_type, square):
+        bb = BB_SQUARES[square]
+        self.bbs[piece_type] ^= bb
+        self.occ_co[colour] ^= bb
+        self.occupied ^= bb
+        self.key ^= Z_PIECE[colour][piece_type][square]
+
+    def push(self, m):
+        frm, to, promotion = m & 63, m >> 6 & 63, m >> 12 & 7
+        turn = self.turn
+        types = self.types
+        piece_type = types[frm]
+        capture_square = to - 8 if turn == c.WHITE else to + 8
+        if not m & EP:
+            capture_square = to
+        captured = types[capture_square]
+        zeroing = piece_type == PAWN or captured
+        self.stack.append((m, captured, self.castling, self.ep_square, self.ep_hashed,
+                           self.halfmove_clock, self.key, self.start, self._legal))
+        irreversible = zeroing or self.ep_hashed is not None
+
+        if captured:
+            self._toggle(not turn, captured, capture_square)
+            types[capture_square] = 0
+        self._toggle(turn, piece_type, frm)
+        types[frm] = 0
+        if promotion:
+            piece_type = promotion
+        self._toggle(turn, piece_type, to)
+        types[to] = piece_type
+        if m & CASTLE:
+            rook_from, rook_to = (frm + 3, frm + 1) if to > frm else (frm - 4, frm - 1)
+            self._toggle(turn, ROOK, rook_from)
+            self._toggle(turn, ROOK, rook_to)
+            types[rook_from], types[rook_to] = 0, ROOK
+
+        castling = self.castling & ~BB_SQUARES[frm] & ~BB_SQUARES[to]
+        if piece_type == KING:
+            castling &= ~(c.BB_RANK_1 if turn == c.WHITE else c.BB_RANK_8)
+        if castling != self.castling:
+            for sq in scan_reversed(castling ^ self.castling):
+                self.key ^= Z_CASTLE[sq]
+            self.castling = castling
+            irreversible = True
+
+        self.halfmove_clock = 0 if zeroing else self.halfmove_clock + 1
+        self.turn = not turn
+        self.key ^= Z_TURN
+        if self.ep_hashed is not None:
+            self.key ^= Z_EP[self.ep_hashed & 7]
+        self.ep_square = self.ep_hashed = None
+        if piece_type == PAWN and abs(to - frm) == 16:
+            self.ep_square = (frm + to) // 2
+            if self._has_legal_ep():
+                self.ep_hashed = self.ep_square
+                self.key ^= Z_EP[self.ep_square & 7]
+
+        if irreversible:
+            self.start = len(self.history)
+        self.history.append(self.key)
+        self._legal = None
+
+    def pop(self):
+        (m, captured, self.castling, self.ep_square, self.ep_hashed,
+         self.halfmove_clock, key, self.start, self._legal) = self.stack.pop()
+        self.history.pop()
+        frm, to = m & 63, m >> 6 & 63
+        self.turn = turn = not self.turn
+        types = self.types
+        piece_type = types[to]
+        if m & CASTLE:
+            rook_from, rook_to = (frm + 3, frm + 1) if to > frm else (frm - 4, frm - 1)
+            self._toggle(turn, ROOK, rook_to)
+            self._toggle(turn, ROOK, rook_from)
+            types[rook_to], types[rook_from] = 0, ROOK
+        self._toggle(turn, piece_type, to)
+        types[to] = 0
+        if m >> 12 & 7:
+            piece_type = PAWN
+        self._toggle(turn, piece_type, frm)
+        types[frm] = piece_type
+        if captured:
+            capture_square = to
+            if m & EP:
+                capture_square = to - 8 if turn == c.WHITE else to + 8
+            self._toggle(not turn, captured, capture_square)
+            types[capture_square] = captured
+        self.key = key
+        return m
+
+    # Game end ##################################################################
+
+    def repetitions(self, key=None):
+        "Occurrences of key (default: current position) since the last irreversible move"
+        if key is None:
+            key = self.key
+        history = self.history
+        n = 0
+        for i in range(len(history) - 1, self.start - 1, -1):
+            if history[i] == key:
+                n += 1
+        return n
+
+    def has_insufficient_material(self, colour):
+        bbs = self.bbs
+        ours = self.occ_co[colour]
+        if ours & (bbs[PAWN] | bbs[ROOK] | bbs[QUEEN]):
+            return False
+        if ours & bbs[KNIGHT]:
+            return popcount(ours) <= 2 and not (self.occ_co[not colour] & ~bbs[KING] & ~bbs[QUEEN])
+        if ours & bbs[BISHOP]:
+            same_colour = (not bbs[BISHOP] & c.BB_DARK_SQUARES) or (not bbs[BISHOP] & c.BB_LIGHT_SQUARES)
+            return same_colour and not bbs[PAWN] and not bbs[KNIGHT]
+        return True
+
+    def result(self, claim_draw=False):
+        "Same as chess.Board.result()"
+        if not self.has_legal_move():
+            if self.is_check():
+                return '0-1' if self.turn == c.WHITE else '1-0'
+            return '1/2-1/2'
+        if self.has_insufficient_material(c.WHITE) and self.has_insufficient_material(c.BLACK):
+            return '1/2-1/2'
+        if self.halfmove_clock >= 150 or self.repetitions() >= 5:
+            return '1/2-1/2'
+        if claim_draw:
+            if self.halfmove_clock >= 100 or (self.halfmove_clock >= 99 and self._fifty_move_claimable()):
+                return '1/2-1/2'
+            if self._threefold_claimable():
+                return '1/2-1/2'
+        return '*'
+
+    def _fifty_move_claimable(self):
+        for m in self.legal_moves():
+            if not self.is_zeroing(m):
+                self.push(m)
+                try:
+                    if self.has_legal_move():
+                        return True
+                finally:
+                    self.pop()
+        return False
+
+    def _threefold_claimable(self):
+        if self.repetitions() >= 3:
+            return True
+        # the next position must already appear twice in the window, with the other side to move
+        if len(self.history) - self.start < 3:
+            return False
+        window = self.history[self.start:]
+        for m in self.legal_moves():
+            if self.is_zeroing(m):
+                continue
+            self.push(m)
+            key = self.key
+            self.pop()
+            if window.count(key) >= 2:
+                return True
+        return False
+
+    def perft(self, depth):
+        "Count leaf nodes of the legal move tree (checked against python-chess by running this module)"
+        if depth <= 0:
+            return 1
+        moves = self.legal_moves()
+        if depth == 1:
+            return len(moves)
+        n = 0
+        for m in moves:
+            self.push(m)
+            n += self.perft(depth - 1)
+            self.pop()
+        return n
+
+
+if __name__ == "__main__":
+    # Self-check against python-chess: perft on the standard test positions, then result() and the position
+    # key along random games biased towards quiet moves, so repetitions and the fifty-move rule come up
+    import random
+
+    def chess_perft(board, depth):
+        if depth == 1:
+            return board.legal_moves.count()
+        n = 0
+        for move in list(board.legal_moves):
+            board.push(move)
+            n += chess_perft(board, depth - 1)
+            board.pop()
+        return n
+
+    for fen in [c.STARTING_FEN,
+                "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+                "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+                "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+                "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+                "8/8/8/2k5/3Pp3/8/8/4K2R b K d3 0 1",
+                "8/8/3k4/8/1K1pP2r/8/8/8 b - e3 0 1"]:
+        board = c.Board(fen)
+        sb = SearchBoard(board)
+        for depth in (1, 2, 3):
+            expected, got = chess_perft(board, depth), sb.perft(depth)
+            assert expected == got, f"perft({depth}) of {fen}: {got}, python-chess {expected}"
+    print('perft ok')
+
+    random.seed(1)
+    checks = 0
+    for game in range(200):
+        board = c.Board(random.choice([c.STARTING_FEN,
+                                       "4k3/8/8/8/8/8/8/R3K2R w KQ - 95 60",
+                                       "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1",
+                                       "4k3/3p4/8/4P3/8/8/8/4K3 b - - 0 1",
+                                       "4k3/8/8/8/2n5/8/8/4KB2 w - - 0 1"]))
+        sb = SearchBoard(board)
+        while True:
+            expected, got = board.result(claim_draw=True), sb.result(claim_draw=True)
+            assert expected == got, f"result() of {board.fen()} after {board.move_stack}: {got}, python-chess {expected}"
+            assert sorted(sb.to_chess(m).uci() for m in sb.legal_moves()) == sorted(m.uci() for m in board.legal_moves)
+            assert sb.key == sb.zobrist()
+            checks += 1
+            if expected != '*' or len(board.move_stack) >= 200:
+                break
+            moves = list(board.legal_moves)
+            quiet = [m for m in moves if not board.is_zeroing(m)]
+            move = random.choice(quiet if quiet and random.random() < 0.9 else moves)
+            board.push(move)
+            sb.push(sb.from_chess(move))
+        while board.move_stack:
+            board.pop()
+            sb.pop()
+            assert sb.key == sb.zobrist()
+    print('result ok,', checks, 'positions')